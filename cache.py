@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Tuple
+
+
+class VideoDetailsCache:
+    """
+    Thread-safe on-disk cache of video details, keyed by video ID.
+    Entries are (exists, duration_seconds) tuples, as returned by
+    get_video_details. Entries older than `ttl` seconds, or `missing_ttl`
+    seconds for videos that don't exist, are ignored and removed the next
+    time the cache is opened.
+    """
+
+    def __init__(self, path: str, ttl: float, missing_ttl: float):
+        self.ttl = ttl
+        self.missing_ttl = missing_ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS videos ("
+                "video_id TEXT PRIMARY KEY, available INTEGER, duration INTEGER, updated REAL)"
+            )
+            self._conn.execute(
+                "DELETE FROM videos WHERE updated < (CASE WHEN available THEN ? ELSE ? END)",
+                self._oldest_valid()
+            )
+
+    def _oldest_valid(self) -> Tuple[float, float]:
+        """
+        Oldest update time of entries that haven't expired yet, for existing
+        and for missing videos.
+        """
+        now = time.time()
+        return now - self.ttl, now - self.missing_ttl
+
+    def get_many(self, video_ids: Iterable[str]) -> Dict[str, Tuple[bool, int]]:
+        """
+        Look up several videos at once.
+        Returns a dictionary with the videos that are in the cache.
+        """
+        video_ids = list(video_ids)
+        if not video_ids:
+            return {}
+        placeholders = ",".join("?" * len(video_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT video_id, available, duration FROM videos "
+                f"WHERE video_id IN ({placeholders}) "
+                f"AND updated >= (CASE WHEN available THEN ? ELSE ? END)",
+                (*video_ids, *self._oldest_valid())
+            ).fetchall()
+        return {vid: (bool(available), duration) for vid, available, duration in rows}
+
+    def put_many(self, details: Dict[str, Tuple[bool, int]]) -> None:
+        """
+        Store the details of several videos, replacing older entries.
+        """
+        if not details:
+            return
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO videos VALUES (?, ?, ?, ?)",
+                [(vid, int(exists), duration, now) for vid, (exists, duration) in details.items()]
+            )
@@ -1,24 +1,39 @@
 #!/usr/bin/env python3
 import argparse
+import itertools
 import json
+import mmap
 import os
+import queue
+import sys
+import threading
 import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from colorama import Fore, Style, init
+from googleapiclient.errors import HttpError
 from tqdm import tqdm
 
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to the standard json module
+    orjson = None
+
 from youtube import (
     get_authenticated_service,
     get_playlists,
     get_video_details,
     get_playlist_size,
-    extract_video_id,
-    create_playlist_item,
+    invalidate_playlist_size,
+    extract_video_ids_bulk,
+    create_playlist_items_batch,
     video_exists_in_playlist,
     get_playlist_video_ids,
-    QuotaExceededException
+    QuotaExceededException,
+    MAX_BATCH_SIZE,
+    MAX_CONCURRENT_BATCHES
 )
-from googleapiclient.http import BatchHttpRequest
 
 
 # Initialize colorama
@@ -27,52 +42,100 @@ init()
 # Constants
 TEMP_FILE = "remaining_videos.json"
 QUOTA_RESET_HOURS = 24
+COUNTDOWN_INTERVAL = 10  # Seconds between two updates of the quota reset countdown
+
+# Results of a single run of the script
+DONE = "done"
+RESTART = "restart"
+
+# Marks the end of the video IDs read from the links file
+END_OF_LINKS = object()
+
+# Why a video is skipped during validation, as shown in the summary
+SKIP_REASONS = {
+    "duplicate": "already in the playlist",
+    "unavailable": "unavailable or private",
+    "too_short": "shorter than the minimum duration",
+    "too_long": "longer than the maximum duration",
+}
+
 
+# Messages go through tqdm.write so they are printed above any active
+# progress bar instead of forcing it to be redrawn after every line.
 
 def log_info(message):
     """Print an info message in cyan"""
-    print(f"{Fore.CYAN}{message}{Style.RESET_ALL}")
+    tqdm.write(f"{Fore.CYAN}{message}{Style.RESET_ALL}")
 
 
 def log_success(message):
     """Print a success message in green"""
-    print(f"{Fore.GREEN}{message}{Style.RESET_ALL}")
+    tqdm.write(f"{Fore.GREEN}{message}{Style.RESET_ALL}")
 
 
 def log_warning(message):
     """Print a warning message in yellow"""
-    print(f"{Fore.YELLOW}Warning: {message}{Style.RESET_ALL}")
+    tqdm.write(f"{Fore.YELLOW}Warning: {message}{Style.RESET_ALL}")
 
 
 def log_error(message):
     """Print an error message in red"""
-    print(f"{Fore.RED}Error: {message}{Style.RESET_ALL}")
+    tqdm.write(f"{Fore.RED}Error: {message}{Style.RESET_ALL}")
+
+
+def write_json_atomic(path, data):
+    """
+    Write data as JSON to path without ever leaving a partially written file:
+    the data goes to a temporary file first, which then replaces path.
+    """
+    tmp_path = path + ".tmp"
+    if orjson:
+        with open(tmp_path, 'wb') as f:
+            f.write(orjson.dumps(data))
+    else:
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+    os.replace(tmp_path, path)
+
 
+def read_json(path):
+    """Read a JSON file written by write_json_atomic, in a single read"""
+    with open(path, 'rb') as f:
+        content = f.read()
+    return orjson.loads(content) if orjson else json.loads(content)
 
-def save_remaining_videos(videos, playlist_id):
-    """Save remaining videos to a temporary file"""
+
+def save_remaining_videos(videos, playlist_id, existing_ids=None):
+    """
+    Save remaining videos to a temporary file, along with the videos known
+    to be in the playlist so they don't have to be fetched again on resume
+    """
     timestamp = datetime.now().isoformat() + " quota_exceeded"
     
     data = {
         "playlist_id": playlist_id,
         "videos": videos,
+        "existing_ids": sorted(existing_ids) if existing_ids is not None else None,
         "timestamp": timestamp
     }
-    with open(TEMP_FILE, 'w') as f:
-        json.dump(data, f)
+    write_json_atomic(TEMP_FILE, data)
     log_info(f"Saved {len(videos)} remaining videos to {TEMP_FILE}")
 
 
 def load_remaining_videos():
-    """Load remaining videos from temporary file if it exists"""
+    """
+    Load remaining videos from temporary file if it exists.
+    Returns (playlist_id, videos, timestamp, existing_ids), where existing_ids
+    is None if the videos in the playlist were not saved.
+    """
     if not os.path.exists(TEMP_FILE):
-        return None, None, None
+        return None, None, None, None
     
-    with open(TEMP_FILE, 'r') as f:
-        data = json.load(f)
+    data = read_json(TEMP_FILE)
     
     log_info(f"Loaded {len(data['videos'])} remaining videos from {TEMP_FILE}")
-    return data["playlist_id"], data["videos"], data.get("timestamp")
+    existing_ids = set(data["existing_ids"]) if data.get("existing_ids") is not None else None
+    return data["playlist_id"], data["videos"], data.get("timestamp"), existing_ids
 
 
 def load_pending_validation():
@@ -81,13 +144,111 @@ def load_pending_validation():
     if not os.path.exists(pending_file):
         return None, None
     
-    with open(pending_file, 'r') as f:
-        data = json.load(f)
+    data = read_json(pending_file)
     
     log_info(f"Loaded {len(data['videos'])} videos that need validation from {pending_file}")
     return data["videos"], data.get("timestamp")
 
 
+def read_video_ids(path, id_queue):
+    """
+    Read the video IDs from a links file into id_queue, in order and without duplicates.
+    Duplicates are detected by video ID so different URLs for the same video
+    (e.g. youtu.be/X and youtube.com/watch?v=X) are only validated once.
+    Puts END_OF_LINKS when done, or the exception if the file can't be read.
+    Meant to run on a background thread.
+    """
+    try:
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                video_ids = []  # mmap can't map an empty file
+            else:
+                # Scan the raw file contents in place instead of decoding them
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    video_ids = extract_video_ids_bulk(mm)
+    except OSError as e:
+        id_queue.put(e)
+        return
+    
+    for vid in dict.fromkeys(video_ids):
+        id_queue.put(vid)
+    id_queue.put(END_OF_LINKS)
+
+
+def iter_queue(id_queue):
+    """Yield the video IDs put in the queue by read_video_ids as they arrive"""
+    while True:
+        item = id_queue.get()
+        if item is END_OF_LINKS:
+            return
+        if isinstance(item, Exception):
+            raise item
+        yield item
+
+
+def get_skip_reason(vid, details, existing_video_ids, min_duration=None, max_duration=None):
+    """
+    Check whether a validated video should be skipped instead of added.
+    details is the (exists, duration_seconds) tuple from get_video_details.
+    Returns None if the video can be added, otherwise the reason, one of
+    the keys of SKIP_REASONS.
+    """
+    exists, duration = details
+
+    # Skip if the video is already in the playlist
+    if existing_video_ids and vid in existing_video_ids:
+        return "duplicate"
+
+    if not exists:
+        return "unavailable"
+
+    duration_minutes = duration / 60
+    if min_duration and duration_minutes < min_duration:
+        return "too_short"
+
+    if max_duration and duration_minutes > max_duration:
+        return "too_long"
+
+    return None
+
+
+def choose_playlist(playlists, playlist_id=None, playlist_index=None):
+    """
+    Pick the playlist to use, from the command line options if given,
+    otherwise by asking the user.
+    playlists is the list of (playlist_id, title, item_count) from get_playlists.
+    Returns a tuple (playlist_id, title), or None if the choice is invalid.
+    """
+    if playlist_id:
+        for pid, title, _ in playlists:
+            if pid == playlist_id:
+                return pid, title
+        log_error(f"Playlist {playlist_id} was not found in your playlists")
+        return None
+    
+    if playlist_index is not None:
+        if 1 <= playlist_index <= len(playlists):
+            pid, title, _ = playlists[playlist_index - 1]
+            return pid, title
+        log_error(f"Invalid playlist index. Please use a number between 1 and {len(playlists)}")
+        return None
+    
+    log_info("\nAvailable playlists:")
+    for i, (pid, title, size) in enumerate(playlists, 1):
+        print(f"{Fore.CYAN}{i}. {title}{Style.RESET_ALL} (ID: {pid}, Videos: {size})")
+
+    # Get user choice
+    while True:
+        try:
+            choice = int(input(f"\n{Fore.CYAN}Enter the number of the playlist to use (1-{len(playlists)}): {Style.RESET_ALL}"))
+            if 1 <= choice <= len(playlists):
+                pid, title, _ = playlists[choice-1]
+                return pid, title
+            log_error(f"Invalid choice. Please enter a number between 1 and {len(playlists)}")
+        except ValueError:
+            log_error("Please enter a valid number")
+
+
 def wait_for_quota_reset(timestamp=None, non_blocking=False):
     """
     Wait until the quota resets (24 hours from the timestamp).
@@ -113,25 +274,35 @@ def wait_for_quota_reset(timestamp=None, non_blocking=False):
         log_info(f"Please run the script again after {reset_time.strftime('%Y-%m-%d %H:%M:%S')} to continue.")
         exit(0)
     
-    # Display a countdown timer
+    # Display a countdown timer, redrawn every COUNTDOWN_INTERVAL seconds.
+    # Only offer to exit if someone can answer, so unattended runs keep waiting.
+    interactive = sys.stdin is not None and sys.stdin.isatty()
+    deadline = time.monotonic() + wait_seconds
     try:
-        while wait_seconds > 0:
-            hours, remainder = divmod(int(wait_seconds), 3600)
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            hours, remainder = divmod(int(remaining), 3600)
             minutes, seconds = divmod(remainder, 60)
             time_str = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
             print(f"\rWaiting for quota reset: {time_str} remaining", end="", flush=True)
             
             # If wait is very long (more than 1 hour), ask user if they want to exit
-            if hours > 0 and wait_seconds % 300 == 0:  # Check every 5 minutes
+            if interactive and hours > 0 and int(remaining) % 300 < COUNTDOWN_INTERVAL:  # Check every 5 minutes
                 print("\r" + " " * 50 + "\r", end="")  # Clear the line
-                exit_choice = input(f"{Fore.YELLOW}Long wait detected. Would you like to exit and resume later? (y/n): {Style.RESET_ALL}")
+                try:
+                    exit_choice = input(f"{Fore.YELLOW}Long wait detected. Would you like to exit and resume later? (y/n): {Style.RESET_ALL}")
+                except EOFError:
+                    # stdin was closed, keep waiting as if the answer was no
+                    interactive = False
+                    exit_choice = 'n'
                 if exit_choice.lower() == 'y':
                     log_info("The script has saved its state and will exit now.")
                     log_info(f"Please run the script again after {reset_time.strftime('%Y-%m-%d %H:%M:%S')} to continue.")
                     exit(0)
             
-            time.sleep(1)
-            wait_seconds -= 1
+            time.sleep(min(COUNTDOWN_INTERVAL, remaining))
         print("\r" + " " * 50 + "\r", end="")  # Clear the line
         log_success("Quota reset time reached. Resuming operation...")
     except KeyboardInterrupt:
@@ -140,13 +311,13 @@ def wait_for_quota_reset(timestamp=None, non_blocking=False):
         exit(0)
 
 
-def process_videos(youtube, valid_video_ids, playlist_id):
-    """Process videos and handle quota limits"""
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--non-blocking", action="store_true")
-    args, _ = parser.parse_known_args()
-    non_blocking = args.non_blocking
-    
+def process_videos(youtube, valid_video_ids, playlist_id, existing_video_ids=None, non_blocking=False):
+    """
+    Process videos and handle quota limits.
+    existing_video_ids is the set of videos already in the playlist, if the
+    caller already fetched it; otherwise it is fetched here.
+    If non_blocking is True, exits instead of waiting when the quota is exceeded.
+    """
     # Create progress bar for adding videos
     total_valid_videos = len(valid_video_ids)
     add_pbar = tqdm(
@@ -155,100 +326,116 @@ def process_videos(youtube, valid_video_ids, playlist_id):
         bar_format="{l_bar}%s{bar}%s{r_bar}" % (Fore.GREEN, Style.RESET_ALL)
     )
 
+    added_count = 0
     error_count = 0
     duplicate_count = 0
     quota_exceeded = False
     
     # Get all existing video IDs in the playlist to avoid duplicates
     try:
-        log_info("Fetching existing videos in the playlist to avoid duplicates...")
-        existing_video_ids = get_playlist_video_ids(youtube, playlist_id)
-        log_info(f"Found {len(existing_video_ids)} existing videos in the playlist")
+        if existing_video_ids is None:
+            log_info("Fetching existing videos in the playlist to avoid duplicates...")
+            existing_video_ids = get_playlist_video_ids(youtube, playlist_id)
+            log_info(f"Found {len(existing_video_ids)} existing videos in the playlist")
     except QuotaExceededException:
         log_error("YouTube API quota exceeded while fetching existing videos.")
         save_remaining_videos(valid_video_ids, playlist_id)
         wait_for_quota_reset(non_blocking=non_blocking)
-        # Re-authenticate and try again
-        youtube = get_authenticated_service()
-        existing_video_ids = get_playlist_video_ids(youtube, playlist_id)
+        # The service refreshes its credentials itself, so just try again
+        try:
+            existing_video_ids = get_playlist_video_ids(youtube, playlist_id)
+            log_info(f"Found {len(existing_video_ids)} existing videos in the playlist")
+        except Exception as e:
+            # Includes the quota being exceeded again
+            log_warning(f"Could not fetch existing videos: {str(e)}")
+            log_warning("Will check for duplicates individually (less efficient)")
+            existing_video_ids = None
     except Exception as e:
         log_warning(f"Could not fetch existing videos: {str(e)}")
         log_warning("Will check for duplicates individually (less efficient)")
-        existing_video_ids = set()
+        # None, unlike an empty set for an empty playlist, means the videos are checked one by one
+        existing_video_ids = None
     
-    # Process video IDs in smaller batches to avoid rate limits
-    batch_size = 50
-    i = 0
+    lock = threading.Lock()
+    handled = set()  # Videos that were added, skipped or failed
+
+    def on_insert(vid, response, exception):
+        """Record the result of one insert, called from a worker thread"""
+        nonlocal added_count, error_count, quota_exceeded
+        with lock:
+            if isinstance(exception, QuotaExceededException):
+                # Leave the video unhandled so it is retried after the quota reset
+                quota_exceeded = True
+                return
+            handled.add(vid)
+            add_pbar.update(1)
+            if exception is not None:
+                error_count += 1
+                log_error(f"Could not add video {vid}: {str(exception)}")
+            else:
+                # Add to our local cache of existing videos
+                if existing_video_ids is not None:
+                    existing_video_ids.add(vid)
+                added_count += 1
+
+    # Process video IDs in rounds of concurrent batch requests to avoid rate limits
+    round_size = MAX_BATCH_SIZE * MAX_CONCURRENT_BATCHES
+    remaining = list(valid_video_ids)
     
-    while i < len(valid_video_ids):
-        if quota_exceeded:
-            # Save remaining videos and wait for quota reset
-            save_remaining_videos(valid_video_ids[i:], playlist_id)
-            wait_for_quota_reset(non_blocking=non_blocking)
-            quota_exceeded = False
-            youtube = get_authenticated_service()  # Re-authenticate after waiting
-            
-            # Refresh the list of existing videos after quota reset
-            try:
-                existing_video_ids = get_playlist_video_ids(youtube, playlist_id)
-            except Exception:
-                # If we can't refresh, continue with what we have
-                pass
-        
-        end_idx = min(i + batch_size, len(valid_video_ids))
-        current_batch = valid_video_ids[i:end_idx]
-        log_info(f"Processing batch {i // batch_size + 1}: {len(current_batch)} video(s)")
+    while remaining:
+        current_round = remaining[:round_size]
+        log_info(f"Processing {len(current_round)} video(s)")
         
-        for j, vid in enumerate(current_batch):
-            try:
+        to_insert = []
+        try:
+            for vid in current_round:
                 # Check if video already exists in the playlist
-                if vid in existing_video_ids:
-                    log_warning(f"Video {vid} already exists in the playlist - skipping")
-                    duplicate_count += 1
-                    add_pbar.update(1)
-                    continue
-                elif not existing_video_ids and video_exists_in_playlist(youtube, playlist_id, vid):
+                if existing_video_ids is not None:
+                    is_duplicate = vid in existing_video_ids
+                else:
                     # Fallback to individual check if bulk check failed
+                    try:
+                        is_duplicate = video_exists_in_playlist(youtube, playlist_id, vid)
+                    except HttpError as e:
+                        # Assume the video isn't in the playlist yet
+                        log_warning(f"Could not check if video {vid} exists: {str(e)}")
+                        is_duplicate = False
+                if is_duplicate:
                     log_warning(f"Video {vid} already exists in the playlist - skipping")
                     duplicate_count += 1
+                    handled.add(vid)
                     add_pbar.update(1)
-                    continue
-                
-                response = create_playlist_item(youtube, playlist_id, vid)
-                add_pbar.update(1)
-                
-                if response is None:
-                    error_count += 1
                 else:
-                    # Add to our local cache of existing videos
-                    existing_video_ids.add(vid)
-                    log_success(f"Added video {vid} to the playlist")
-            
-            except QuotaExceededException:
-                quota_exceeded = True
-                # Save progress at the current position
-                save_remaining_videos(valid_video_ids[i+j:], playlist_id)
-                add_pbar.close()
-                log_warning("YouTube API quota exceeded. Waiting for quota reset...")
-                wait_for_quota_reset(non_blocking=non_blocking)
-                
-                # Re-authenticate and create a new progress bar
-                youtube = get_authenticated_service()
-                add_pbar = tqdm(
-                    total=total_valid_videos,
-                    desc="Adding to playlist",
-                    bar_format="{l_bar}%s{bar}%s{r_bar}" % (Fore.GREEN, Style.RESET_ALL),
-                    initial=i+j
-                )
-                
-                # Continue from where we left off
-                i = i+j
-                break
+                    to_insert.append(vid)
+        except QuotaExceededException:
+            quota_exceeded = True
         
-        if not quota_exceeded:
-            i = end_idx  # Move to the next batch if no quota issues
+        if to_insert and not quota_exceeded:
+            create_playlist_items_batch(youtube, playlist_id, to_insert, on_insert)
+        
+        # Keep the videos that still need to be added, in their original order
+        remaining = [vid for vid in remaining if vid not in handled]
+        
+        if quota_exceeded:
+            # Save progress and wait for the quota reset
+            save_remaining_videos(remaining, playlist_id, existing_video_ids)
+            add_pbar.close()
+            log_warning("YouTube API quota exceeded. Waiting for quota reset...")
+            wait_for_quota_reset(non_blocking=non_blocking)
+            quota_exceeded = False
+            
+            # Create a new progress bar
+            add_pbar = tqdm(
+                total=total_valid_videos,
+                desc="Adding to playlist",
+                bar_format="{l_bar}%s{bar}%s{r_bar}" % (Fore.GREEN, Style.RESET_ALL),
+                initial=total_valid_videos - len(remaining)
+            )
+            # existing_video_ids already includes every video added since it
+            # was fetched, so it doesn't need to be fetched again
 
     add_pbar.close()
+    log_success(f"Added {added_count} video(s) to the playlist")
     
     # Clean up temp file if all videos were processed
     if os.path.exists(TEMP_FILE):
@@ -266,17 +453,33 @@ def process_videos(youtube, valid_video_ids, playlist_id):
         log_warning("\nAll videos were already in the playlist. Nothing to add.")
 
 
-def main():
+def _build_parser():
+    """Build the command line parser"""
     parser = argparse.ArgumentParser(
         description="Add YouTube links from a text file to an existing playlist.")
     parser.add_argument("txt_file", help="Text file containing YouTube links (one per line)")
     parser.add_argument("--min-duration", type=float, help="Minimum video duration in minutes")
     parser.add_argument("--max-duration", type=float, help="Maximum video duration in minutes")
     parser.add_argument("--non-blocking", action="store_true", help="Exit instead of waiting when quota is exceeded")
-    args = parser.parse_args()
+    playlist_group = parser.add_mutually_exclusive_group()
+    playlist_group.add_argument("--playlist-id", help="ID of the playlist to use, instead of choosing interactively")
+    playlist_group.add_argument("--playlist-index", type=int,
+                                help="Number of the playlist to use, as shown in the playlist list")
+    return parser
+
+
+def _run(args):
+    """
+    Run the script once with the parsed command line arguments.
+    Returns RESTART if it has to start over after waiting for a quota reset, DONE otherwise.
+    """
+    # Read the links file in the background while we authenticate and select a playlist.
+    # The IDs are then sent for validation in batches as soon as they are read.
+    id_queue = queue.Queue()
+    threading.Thread(target=read_video_ids, args=(args.txt_file, id_queue), daemon=True).start()
 
     # Check if we have remaining videos from a previous run
-    saved_playlist_id, saved_videos, timestamp = load_remaining_videos()
+    saved_playlist_id, saved_videos, timestamp, saved_existing_ids = load_remaining_videos()
     
     # Check if we need to wait for quota reset before starting
     if timestamp and "quota" in timestamp.lower():
@@ -312,18 +515,24 @@ def main():
             log_info(f"Resuming with playlist ID: {saved_playlist_id}")
             
             try:
-                # Test the API with a lightweight call to check if quota is available
+                # Test the API with a lightweight call to check if quota is available.
+                # After a restart the size may be cached, which would skip the call.
+                invalidate_playlist_size(saved_playlist_id)
                 get_playlist_size(youtube, saved_playlist_id)
-                process_videos(youtube, saved_videos, saved_playlist_id)
-                return
+                process_videos(youtube, saved_videos, saved_playlist_id, saved_existing_ids,
+                               non_blocking=args.non_blocking)
+                return DONE
+            except HttpError as e:
+                log_error(f"Could not access playlist {saved_playlist_id}: {str(e)}")
+                return DONE
             except QuotaExceededException as e:
                 log_error("YouTube API quota is currently exceeded.")
-                save_remaining_videos(saved_videos, saved_playlist_id)
+                save_remaining_videos(saved_videos, saved_playlist_id, saved_existing_ids)
                 wait_for_quota_reset(non_blocking=args.non_blocking)
-                # Re-authenticate and try again
-                youtube = get_authenticated_service()
-                process_videos(youtube, saved_videos, saved_playlist_id)
-                return
+                # The service refreshes its credentials itself, so just try again
+                process_videos(youtube, saved_videos, saved_playlist_id, saved_existing_ids,
+                               non_blocking=args.non_blocking)
+                return DONE
         else:
             # Remove the temporary file if user doesn't want to resume
             os.remove(TEMP_FILE)
@@ -334,11 +543,21 @@ def main():
 
     # Check if quota is available before proceeding
     try:
-        # Get and display available playlists
+        # Get and display available playlists, then let the user pick one
         playlists = get_playlists(youtube)
         if not playlists:
             log_error("No playlists found. Please create a playlist first.")
-            return
+            return DONE
+        
+        selected = choose_playlist(playlists, args.playlist_id, args.playlist_index)
+        if not selected:
+            return DONE
+        playlist_id, playlist_title = selected
+        # Get a fresh count for the selected playlist, the listed one may be outdated
+        current_size = get_playlist_size(youtube, playlist_id)
+    except HttpError as e:
+        log_error(f"Could not load your playlists: {str(e)}")
+        return DONE
     except QuotaExceededException as e:
         log_error("YouTube API quota is currently exceeded.")
         log_warning("Please try again after 24 hours or wait for quota reset.")
@@ -348,121 +567,90 @@ def main():
             "videos": [],
             "timestamp": datetime.now().isoformat() + " quota_exceeded"
         }
-        with open(TEMP_FILE, 'w') as f:
-            json.dump(data, f)
+        write_json_atomic(TEMP_FILE, data)
         wait_for_quota_reset(non_blocking=args.non_blocking)
         # After waiting, restart the script
         log_info("Restarting the script after quota reset...")
-        return main()  # Recursive call to restart
-
-    log_info("\nAvailable playlists:")
-    for i, (playlist_id, title) in enumerate(playlists, 1):
-        size = get_playlist_size(youtube, playlist_id)
-        print(f"{Fore.CYAN}{i}. {title}{Style.RESET_ALL} (ID: {playlist_id}, Videos: {size})")
+        return RESTART
 
-    # Get user choice
-    while True:
-        try:
-            choice = int(input(f"\n{Fore.CYAN}Enter the number of the playlist to use (1-{len(playlists)}): {Style.RESET_ALL}"))
-            if 1 <= choice <= len(playlists):
-                playlist_id = playlists[choice-1][0]
-                current_size = get_playlist_size(youtube, playlist_id)
-                if current_size >= 5000:
-                    log_error("Selected playlist already has 5000 videos (YouTube's limit)")
-                    return
-                log_success(f"\nSelected playlist: {playlists[choice-1][1]}")
-                break
-            else:
-                log_error(f"Invalid choice. Please enter a number between 1 and {len(playlists)}")
-        except ValueError:
-            log_error("Please enter a valid number")
+    if current_size >= 5000:
+        log_error("Selected playlist already has 5000 videos (YouTube's limit)")
+        return DONE
+    log_success(f"\nSelected playlist: {playlist_title}")
 
-    # Get all video IDs first and remove duplicates
-    video_ids = []
-    seen_urls = set()
-    skipped_count = 0
-    
+    # Videos pending validation come first, then the ones read from the file
     log_info("Reading and validating video URLs...")
-    with open(args.txt_file, 'r') as f:
-        for line in f:
-            url = line.strip()
-            if not url or url in seen_urls:
-                continue
-                
-            vid = extract_video_id(url)
-            if vid:
-                video_ids.append(vid)
-                seen_urls.add(url)
-
-    if pending_validation:
-        video_ids = pending_validation + video_ids
-
-    if not video_ids:
-        log_error("No valid YouTube URLs found in the file. Exiting.")
-        return
-
-    log_info(f"Found {len(video_ids)} unique video URLs to process")
+    video_ids = []
 
-    # Create progress bar for validation
+    # Create progress bar for validation; the total is set once all IDs are read
     validation_pbar = tqdm(
-        total=len(video_ids),
+        total=None,
         desc="Validating videos",
         bar_format="{l_bar}%s{bar}%s{r_bar}" % (Fore.BLUE, Style.RESET_ALL)
     )
 
+    def stream_video_ids():
+        """Yield the unique video IDs as they are read, recording them in video_ids"""
+        seen_ids = set()
+        for vid in itertools.chain(pending_validation or [], iter_queue(id_queue)):
+            if vid not in seen_ids:
+                seen_ids.add(vid)
+                video_ids.append(vid)
+                yield vid
+        validation_pbar.total = len(video_ids)
+        validation_pbar.refresh()
+
     # Get video details in batches
+    new_video_ids = stream_video_ids()
     valid_video_ids = []
+    existing_video_ids = None
     try:
-        # First, get all existing videos in the playlist to avoid duplicates
+        # Get all existing videos in the playlist to avoid duplicates.
+        # The playlist pages can only be fetched one after the other, so do it
+        # in the background while the new videos are validated.
+        log_info("Fetching existing videos in the playlist to avoid duplicates...")
+        fetcher = ThreadPoolExecutor(max_workers=1)
+        existing_future = fetcher.submit(get_playlist_video_ids, youtube, playlist_id)
+        fetcher.shutdown(wait=False)
+        
+        video_details = get_video_details(youtube, new_video_ids, on_batch=validation_pbar.update)
+        validation_pbar.close()
+        
         try:
-            log_info("Fetching existing videos in the playlist to avoid duplicates...")
-            existing_video_ids = get_playlist_video_ids(youtube, playlist_id)
+            existing_video_ids = existing_future.result()
             log_info(f"Found {len(existing_video_ids)} existing videos in the playlist")
         except QuotaExceededException:
             raise  # Re-raise to be caught by the outer try-except
         except Exception as e:
             log_warning(f"Could not fetch existing videos: {str(e)}")
             log_warning("Will validate all videos and check for duplicates later")
-            existing_video_ids = set()
+            existing_video_ids = None
         
-        # Track duplicates found during validation
-        duplicate_count = 0
+        if not video_ids:
+            log_error("No valid YouTube URLs found in the file. Exiting.")
+            return DONE
         
-        video_details = get_video_details(youtube, video_ids)
+        log_info(f"Found {len(video_ids)} unique video URLs to process")
         
-        for vid in video_ids:
-            exists, duration = video_details[vid]
-            validation_pbar.update(1)
-
-            # Skip if the video is already in the playlist
-            if existing_video_ids and vid in existing_video_ids:
-                log_warning(f"Video {vid} already exists in the playlist - skipping")
-                duplicate_count += 1
-                continue
-
-            if not exists:
-                log_warning(f"Video {vid} is unavailable or private")
-                skipped_count += 1
-                continue
-
-            duration_minutes = duration / 60
-            if args.min_duration and duration_minutes < args.min_duration:
-                log_warning(f"Video {vid} is too short ({duration_minutes:.1f}m < {args.min_duration}m)")
-                skipped_count += 1
-                continue
-
-            if args.max_duration and duration_minutes > args.max_duration:
-                log_warning(f"Video {vid} is too long ({duration_minutes:.1f}m > {args.max_duration}m)")
-                skipped_count += 1
-                continue
-
-            valid_video_ids.append(vid)
-
-            # Check if adding this video would exceed the 5000 limit
-            if current_size + len(valid_video_ids) > 5000:
-                log_warning(f"Can only add {5000 - current_size} more videos to reach YouTube's 5000 video limit")
-                valid_video_ids = valid_video_ids[:5000 - current_size]
-                break
+        # Filter in a single pass, counting why videos are skipped
+        skip_reasons = {
+            vid: get_skip_reason(vid, video_details[vid], existing_video_ids,
+                                 args.min_duration, args.max_duration)
+            for vid in video_ids
+        }
+        skip_counts = Counter(reason for reason in skip_reasons.values() if reason)
+        valid_video_ids = [vid for vid in video_ids if skip_reasons[vid] is None]
+        
+        for reason, count in skip_counts.items():
+            if reason != "duplicate":
+                log_warning(f"{count} video(s) {SKIP_REASONS[reason]}")
+        duplicate_count = skip_counts["duplicate"]
+        skipped_count = sum(skip_counts.values()) - duplicate_count
+        
+        # Check if adding these videos would exceed the 5000 limit
+        if current_size + len(valid_video_ids) > 5000:
+            log_warning(f"Can only add {5000 - current_size} more videos to reach YouTube's 5000 video limit")
+            valid_video_ids = valid_video_ids[:5000 - current_size]
         
         # Clean up pending validation file if it exists and we've successfully validated
         if os.path.exists("pending_validation.json"):
@@ -471,24 +659,26 @@ def main():
             
     except QuotaExceededException:
         log_error("YouTube API quota exceeded during video validation.")
+        # Finish reading the IDs that were not sent for validation yet
+        for _ in new_video_ids:
+            pass
         # Save the videos we've already validated
         if valid_video_ids:
-            save_remaining_videos(valid_video_ids, playlist_id)
+            save_remaining_videos(valid_video_ids, playlist_id, existing_video_ids)
             log_info(f"Saved {len(valid_video_ids)} validated videos for later processing")
         # Also save the remaining videos that need validation
         remaining_to_validate = [vid for vid in video_ids if vid not in valid_video_ids]
         if remaining_to_validate:
             # Create a separate file for videos that still need validation
-            with open("pending_validation.json", 'w') as f:
-                json.dump({
-                    "videos": remaining_to_validate,
-                    "timestamp": datetime.now().isoformat() + " quota_exceeded"
-                }, f)
+            write_json_atomic("pending_validation.json", {
+                "videos": remaining_to_validate,
+                "timestamp": datetime.now().isoformat() + " quota_exceeded"
+            })
             log_info(f"Saved {len(remaining_to_validate)} videos that still need validation")
         
         wait_for_quota_reset(non_blocking=args.non_blocking)
         log_info("Restarting after quota reset...")
-        return main()  # Restart from the beginning
+        return RESTART
     finally:
         validation_pbar.close()
 
@@ -498,7 +688,7 @@ def main():
             log_warning(f"Skipped {skipped_count} videos due to availability/duration constraints")
         if duplicate_count > 0:
             log_info(f"Skipped {duplicate_count} videos that were already in the playlist")
-        return
+        return DONE
 
     log_success(f"\nFound {len(valid_video_ids)} valid video(s) to add")
     if skipped_count > 0:
@@ -506,8 +696,23 @@ def main():
     if duplicate_count > 0:
         log_info(f"Skipped {duplicate_count} videos that were already in the playlist")
 
-    # Process the videos with quota handling
-    process_videos(youtube, valid_video_ids, playlist_id)
+    # Process the videos with quota handling, reusing the playlist contents fetched above
+    process_videos(youtube, valid_video_ids, playlist_id, existing_video_ids,
+                   non_blocking=args.non_blocking)
+    return DONE
+
+
+def main(argv=None):
+    """Run the script with the given command line arguments, sys.argv by default"""
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+
+    if not os.path.isfile(args.txt_file):
+        parser.error(f"File not found: {args.txt_file}")
+
+    # Start over after each quota wait in a loop rather than recursively
+    while _run(args) == RESTART:
+        pass
 
 
 if __name__ == "__main__":
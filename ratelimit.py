@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter.
+    Tokens are refilled at `rate` per second, up to `capacity`.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, cost: float = 1) -> None:
+        """
+        Block until `cost` tokens are available, then consume them.
+        A cost larger than the capacity waits for a full bucket and leaves it
+        in debt, so later callers wait for the difference.
+        """
+        with self._lock:
+            needed = min(cost, self.capacity)
+            self._refill()
+            while self._tokens < needed:
+                time.sleep((needed - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= cost
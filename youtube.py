@@ -1,36 +1,279 @@
 #!/usr/bin/env python3
+import json
 import os
-import pickle
 import re
-from typing import List, Tuple, Optional, Dict
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Tuple, Optional, Dict, Set, Union
 
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
+import google_auth_httplib2
+import httplib2
+from google.auth.exceptions import RefreshError
 from googleapiclient.errors import HttpError
+from googleapiclient.http import build_http
+from googleapiclient.model import JsonModel
 
-# If modifying these scopes, delete your previously saved token.pickle.
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to the standard json module
+    orjson = None
+
+from cache import VideoDetailsCache
+from ratelimit import TokenBucket
+
+# If modifying these scopes, delete your previously saved token.json.
 SCOPES = ['https://www.googleapis.com/auth/youtube.force-ssl']
 
+# Token file that stores the user's access and refresh tokens
+TOKEN_FILE = 'token.json'
+# Token file written by earlier versions, converted to TOKEN_FILE on first run
+LEGACY_TOKEN_FILE = 'token.pickle'
+
+# Details of available videos are cached on disk between runs. The duration of
+# a processed video doesn't change, they are only checked again in case they
+# were deleted or made private since.
+VIDEO_CACHE_FILE = 'yt_cache.sqlite'
+VIDEO_CACHE_TTL = 30 * 24 * 3600  # Seconds
+# Unavailable videos are cached too, so they aren't looked up on every run,
+# but not for as long since they may just not be processed or public yet.
+MISSING_VIDEO_CACHE_TTL = 24 * 3600  # Seconds
+
 API_SERVICE_NAME = 'youtube'
 API_VERSION = 'v3'
 
+# Seconds to wait for the server before a request fails
+HTTP_TIMEOUT = 30
+
+# Maximum number of API requests in flight at the same time
+MAX_CONCURRENT_REQUESTS = 8
+
+# Maximum number of videos.list batches sent but not yet collected
+MAX_PENDING_BATCHES = 2 * MAX_CONCURRENT_REQUESTS
+
+# Maximum number of requests in a single batch request (API limit)
+MAX_BATCH_SIZE = 50
+
+# Maximum number of batch requests executed at the same time
+MAX_CONCURRENT_BATCHES = 5
+
+# Quota cost of API calls, in units
+# https://developers.google.com/youtube/v3/determine_quota_cost
+LIST_COST = 1
+INSERT_COST = 50
+
+# Sustained rate and burst size of quota units spent on API calls.
+# The daily quota is handled by saving progress and waiting for the reset;
+# this only smooths out bursts so requests don't get rate limited.
+QUOTA_UNITS_PER_SECOND = 1000
+QUOTA_BURST_UNITS = 5000
+
+# Minimum time between two playlist inserts, in seconds. Inserts sent faster
+# than this, even within a batch, tend to fail with rate limit errors.
+INSERT_MIN_INTERVAL = 0.15
+
+# Error reasons meaning the daily quota is used up, until it resets
+QUOTA_REASONS = {'quotaExceeded', 'dailyLimitExceeded'}
+
+# Error reasons for which the request is retried after a delay
+RATE_LIMIT_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded'}
+# Server errors that usually succeed when the request is sent again
+TRANSIENT_STATUSES = {500, 502, 503, 504}
+# Failures to send a request or to get its response, including timeouts and
+# failed token refreshes
+TRANSPORT_ERRORS = (OSError, httplib2.HttpLib2Error, RefreshError)
+# Retries of rate limited requests, server errors and connection failures.
+# Each attempt is charged to the rate limiter.
+MAX_RETRIES = 5
+
+_rate_limiter = TokenBucket(QUOTA_UNITS_PER_SECOND, QUOTA_BURST_UNITS)
+# A bucket of a single token enforces the interval without allowing bursts
+_insert_pacer = TokenBucket(1 / INSERT_MIN_INTERVAL, 1)
+
+# Per-thread state for requests executed from worker threads
+_thread_local = threading.local()
+
+# Worker threads shared by all concurrent API calls. The pool lives for the
+# whole process so each thread keeps its connection open between calls.
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_batch_slots = threading.BoundedSemaphore(MAX_CONCURRENT_BATCHES)
+
+# Video ID in YouTube URLs: watch?v=<id>, youtu.be/<id>, /embed/<id>,
+# /shorts/<id>, /live/<id> and /v/<id>, used to find all the video URLs in a
+# whole text at once. The host must be youtube.com (or its www., m. and music.
+# subdomains) or youtu.be, at the start of the text or after a scheme, space,
+# quote or bracket, so e.g. notyoutube.com/watch?v=<id> or evil.youtube.com/...
+# are not matched.
+_URL_VIDEO_ID_RE = re.compile(
+    r"(?<![^\s/\"'<(\[])(?:(?:www|m|music)\.)?"
+    r"(?:youtube\.com/(?:\S*?[?&]v=|embed/|shorts/|live/|v/)|youtu\.be/)([0-9A-Za-z_-]{11})",
+    re.IGNORECASE
+)
+
+_URL_VIDEO_ID_BYTES_RE = re.compile(_URL_VIDEO_ID_RE.pattern.encode(), re.IGNORECASE)
+
+# ISO 8601 duration as returned by the API, e.g. PT1H2M10S
+_DURATION_RE = re.compile(r'PT(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?')
+
+# Seconds per unit of the time part of an ISO 8601 duration (after the 'T')
+_DURATION_TIME_UNITS = {'H': 3600, 'M': 60, 'S': 1}
+
+# Service object shared by all callers, see get_authenticated_service
+_service = None
+
+# Results cached for the lifetime of the process. Playlist sizes are
+# updated after each insert, so they stay correct without being fetched again.
+_playlists_cache: Optional[List[Tuple[str, str, int]]] = None
+_playlist_size_cache: Dict[str, int] = {}
+_playlist_size_lock = threading.Lock()
+
+# Opened on first use, so nothing is created for e.g. --help
+_video_cache: Optional[VideoDetailsCache] = None
+_video_cache_lock = threading.Lock()
+
 
 class QuotaExceededException(Exception):
     """Exception raised when YouTube API quota is exceeded."""
     pass
 
 
+class OrjsonModel(JsonModel):
+    """
+    JSON model that parses API responses with orjson instead of json.
+    Used by the service object when orjson is installed.
+    """
+
+    def deserialize(self, content):
+        try:
+            body = orjson.loads(content)
+        except orjson.JSONDecodeError:
+            # Same as JsonModel: return the raw content if it isn't JSON
+            return content.decode('utf-8') if isinstance(content, bytes) else content
+        if self._data_wrapper and isinstance(body, dict) and 'data' in body:
+            body = body['data']
+        return body
+
+
+def _error_reasons(e: HttpError) -> Set[str]:
+    """
+    Get the error reasons (e.g. 'quotaExceeded') from an API error response.
+    """
+    reasons = set()
+    # The client library only keeps one of the lists of details of the error,
+    # e.g. ErrorInfo entries instead of errors[].reason, so read both
+    details = getattr(e, 'error_details', None)
+    if isinstance(details, list):
+        reasons.update(detail.get('reason') for detail in details if isinstance(detail, dict))
+    try:
+        data = json.loads(e.content)
+        reasons.update(error.get('reason') for error in data['error']['errors'])
+    except (ValueError, KeyError, TypeError, AttributeError):
+        pass
+    reasons.discard(None)
+    return reasons
+
+
+def _is_rate_limited(e: HttpError) -> bool:
+    """
+    Check if a request failed because it was sent too fast.
+    """
+    return e.resp.status == 429 or bool(_error_reasons(e) & RATE_LIMIT_REASONS)
+
+
+def _is_transient(e: HttpError) -> bool:
+    """
+    Check if a request failed for a reason that is likely to go away when
+    it is sent again later.
+    """
+    return e.resp.status in TRANSIENT_STATUSES or _is_rate_limited(e)
+
+
+def _is_quota_exceeded(e: HttpError) -> bool:
+    """
+    Check if a request failed because the daily quota is exceeded.
+    """
+    return e.resp.status == 403 and bool(_error_reasons(e) & QUOTA_REASONS)
+
+
+def _retry_delay(e: Exception, attempt: int) -> float:
+    """
+    Get the delay before retrying a request that failed.
+    Uses the Retry-After header if the server sent one, otherwise an
+    exponential backoff.
+    """
+    try:
+        return float(e.resp['retry-after'])
+    except (AttributeError, KeyError, ValueError):
+        return min(2 ** attempt, 32)
+
+
+def _execute(request, cost: int = LIST_COST, http=None):
+    """
+    Execute an API request once its quota cost is available in the rate limiter.
+    Requests that are rate limited, hit a server error or lose their
+    connection are retried up to MAX_RETRIES times, after the delay asked by
+    the server or an exponential backoff. Retries are done here rather than
+    with the client library's num_retries, so every attempt goes through the
+    rate limiter.
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        _rate_limiter.acquire(cost)
+        try:
+            return request.execute(http=http)
+        except (HttpError, OSError) as e:
+            if attempt == MAX_RETRIES or (isinstance(e, HttpError) and not _is_transient(e)):
+                raise
+            time.sleep(_retry_delay(e, attempt))
+
+
+def _build_http():
+    """
+    Build an unauthorized Http object for API requests, with HTTP_TIMEOUT.
+    """
+    http = build_http()
+    http.timeout = HTTP_TIMEOUT
+    return http
+
+
+def _migrate_legacy_token() -> None:
+    """
+    Convert the pickled credentials saved by earlier versions to TOKEN_FILE,
+    then delete the pickle so it is never loaded again.
+    """
+    if os.path.exists(TOKEN_FILE) or not os.path.exists(LEGACY_TOKEN_FILE):
+        return
+    import pickle
+    with open(LEGACY_TOKEN_FILE, 'rb') as token:
+        creds = pickle.load(token)
+    with open(TOKEN_FILE, 'w') as token:
+        token.write(creds.to_json())
+    os.remove(LEGACY_TOKEN_FILE)
+
+
 def get_authenticated_service():
     """
     Authenticate the user and return a YouTube service object.
-    The credentials are stored in token.pickle for later use.
+    The credentials are stored in token.json for later use.
+    The service is built once and then returned by every later call, so all
+    requests made on the main thread reuse the same connection. Its
+    credentials refresh themselves when they expire.
     """
+    global _service
+    if _service is not None:
+        return _service
+
+    # Imported here so that e.g. --help doesn't load the auth and discovery libraries
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    from googleapiclient.discovery import build
+
+    _migrate_legacy_token()
     creds = None
-    # Token file stores the user's access and refresh tokens.
-    if os.path.exists('token.pickle'):
-        with open('token.pickle', 'rb') as token:
-            creds = pickle.load(token)
+    if os.path.exists(TOKEN_FILE):
+        creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
     # If no valid credentials, go through the login flow.
     if not creds or not creds.valid:
         if creds and creds.expired and creds.refresh_token:
@@ -40,136 +283,328 @@ def get_authenticated_service():
                 'client_secrets.json', SCOPES)
             creds = flow.run_local_server(port=8080)
         # Save the credentials for future use.
-        with open('token.pickle', 'wb') as token:
-            pickle.dump(creds, token)
-    return build(API_SERVICE_NAME, API_VERSION, credentials=creds)
+        with open(TOKEN_FILE, 'w') as token:
+            token.write(creds.to_json())
+    model = OrjsonModel() if orjson else None
+    http = google_auth_httplib2.AuthorizedHttp(creds, http=_build_http())
+    # Use the discovery document bundled with the client library instead of
+    # downloading it from Google on every run.
+    _service = build(API_SERVICE_NAME, API_VERSION, http=http, model=model,
+                     static_discovery=True)
+    return _service
 
 
-def extract_video_id(url: str) -> Optional[str]:
+def extract_video_ids_bulk(text: Union[str, bytes]) -> List[str]:
     """
-    Extracts the video ID from a YouTube URL.
-    Supports URLs in various formats.
-    Returns the video ID as a string if found, otherwise None.
+    Extracts the video IDs of all YouTube URLs found in a text,
+    e.g. the whole contents of a links file, in a single regex pass.
+    text can also be raw bytes or a memory-mapped file, which is scanned
+    without decoding it first.
+    Returns the video IDs in order of appearance, including duplicates.
     """
-    # Check if URL contains a YouTube domain
-    youtube_domains = ('youtube.com', 'youtu.be', 'www.youtube.com', 'm.youtube.com')
-    if not any(domain in url.lower() for domain in youtube_domains):
-        return None
+    if isinstance(text, str):
+        return _URL_VIDEO_ID_RE.findall(text)
+    return [vid.decode('ascii') for vid in _URL_VIDEO_ID_BYTES_RE.findall(text)]
 
-    # This regex looks for the video id pattern in typical YouTube URLs.
-    pattern = r"(?:v=|\/)([0-9A-Za-z_-]{11})"
-    match = re.search(pattern, url)
-    return match.group(1) if match else None
 
-
-def get_playlists(youtube) -> List[Tuple[str, str]]:
+def get_playlists(youtube) -> List[Tuple[str, str, int]]:
     """
     Get all playlists for the authenticated user.
-    Returns a list of tuples containing (playlist_id, title).
+    Returns a list of tuples containing (playlist_id, title, item_count).
+    The result is cached for the lifetime of the process.
     """
+    global _playlists_cache
+    if _playlists_cache is not None:
+        return _playlists_cache
     try:
-        request = youtube.playlists().list(
-            part="snippet",
-            mine=True,
-            maxResults=50
-        )
-        response = request.execute()
-        
         playlists = []
-        for item in response.get('items', []):
-            playlists.append((item['id'], item['snippet']['title']))
+        next_page_token = None
+        # Fetch all playlists, paginating as needed
+        while True:
+            request = youtube.playlists().list(
+                part="snippet,contentDetails",
+                mine=True,
+                maxResults=50,  # Maximum allowed by the API
+                pageToken=next_page_token,
+                # Only return what we use
+                fields="items(id,snippet/title,contentDetails/itemCount),nextPageToken"
+            )
+            response = _execute(request)
+            
+            for item in response.get('items', []):
+                playlists.append((
+                    item['id'],
+                    item['snippet']['title'],
+                    int(item['contentDetails']['itemCount'])
+                ))
+            
+            next_page_token = response.get('nextPageToken')
+            if not next_page_token:
+                break
+        
+        _playlists_cache = playlists
         return playlists
     except HttpError as e:
-        if "quota" in str(e).lower():
+        if _is_quota_exceeded(e):
             raise QuotaExceededException(str(e))
         raise
 
 
-def get_video_details(youtube, video_ids: List[str]) -> Dict[str, Tuple[bool, int]]:
+def _get_executor() -> ThreadPoolExecutor:
     """
-    Get video details including existence and duration for multiple videos.
-    Returns a dictionary mapping video_id to tuple (exists, duration_seconds).
-    Uses a single API call for up to 50 videos.
+    Return the shared pool of worker threads, creating it on first use.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS,
+                                           thread_name_prefix="youtube")
+        return _executor
+
+
+def _get_video_cache() -> VideoDetailsCache:
+    """
+    Return the on-disk cache of video details, opening it on first use.
+    """
+    global _video_cache
+    with _video_cache_lock:
+        if _video_cache is None:
+            _video_cache = VideoDetailsCache(VIDEO_CACHE_FILE, VIDEO_CACHE_TTL,
+                                             MISSING_VIDEO_CACHE_TTL)
+        return _video_cache
+
+
+def _thread_http(credentials):
+    """
+    Return an authorized Http object owned by the current thread.
+    httplib2 is not thread-safe, so requests executed from worker threads
+    must not share the connection of the service object. The connection is
+    kept alive and reused by later requests on the same thread.
+    """
+    http = getattr(_thread_local, 'http', None)
+    if http is None or http.credentials is not credentials:
+        http = google_auth_httplib2.AuthorizedHttp(credentials, http=_build_http())
+        _thread_local.http = http
+    return http
+
+
+def _get_video_details_batch(youtube, batch: List[str]) -> Dict[str, Tuple[bool, int]]:
+    """
+    Get video details for a single batch of up to 50 videos.
+    Safe to call from a worker thread.
     """
     results = {}
-    # Process in batches of 50 (API limit)
-    for i in range(0, len(video_ids), 50):
-        batch = video_ids[i:i + 50]
-        try:
-            request = youtube.videos().list(
-                part="contentDetails,status",
-                id=",".join(batch)
-            )
-            response = request.execute()
-            
-            # Create a mapping of found videos
-            found_videos = {
-                item['id']: (
-                    item['status']['uploadStatus'] == 'processed',
-                    parse_duration(item['contentDetails']['duration'])
-                )
-                for item in response.get('items', [])
-                if item['status']['uploadStatus'] == 'processed'
-            }
+    try:
+        request = youtube.videos().list(
+            part="contentDetails,status",
+            id=",".join(batch),
+            # Only return what we use
+            fields="items(id,status/uploadStatus,contentDetails/duration)"
+        )
+        response = _execute(request, http=_thread_http(request.http.credentials))
+        
+        # Add the processed videos, then mark the missing ones as unavailable
+        for item in response.get('items', []):
+            if item['status']['uploadStatus'] == 'processed':
+                results[item['id']] = (True, parse_duration(item['contentDetails']['duration']))
+        for vid in batch:
+            results.setdefault(vid, (False, 0))
+        # Only cache actual answers, not the failures below
+        _get_video_cache().put_many(results)
             
-            # Add results, marking missing videos as unavailable
-            for vid in batch:
-                results[vid] = found_videos.get(vid, (False, 0))
-                
-        except HttpError as e:
-            if "quota" in str(e).lower():
-                raise QuotaExceededException(str(e))
-            # If request fails for other reasons, mark all videos in batch as unavailable
-            for vid in batch:
-                results[vid] = (False, 0)
+    except HttpError as e:
+        if _is_quota_exceeded(e):
+            raise QuotaExceededException(str(e))
+        # If request fails for other reasons, mark all videos in batch as unavailable
+        for vid in batch:
+            results[vid] = (False, 0)
     
     return results
 
 
+def _uncached_batches(video_ids: Iterable[str], results: Dict[str, Tuple[bool, int]],
+                      on_batch: Optional[Callable[[int], None]]):
+    """
+    Yield the video IDs that are not in the cache, in batches of up to 50.
+    The details of cached videos are added to results as they are read.
+    Each video ID is only looked up once, however often it appears.
+    """
+    cache = _get_video_cache()
+    ids = iter(video_ids)
+    seen = set()
+    batch = []
+    for chunk in iter(lambda: list(islice(ids, 50)), []):
+        chunk = [vid for vid in dict.fromkeys(chunk) if vid not in seen]
+        if not chunk:
+            continue
+        seen.update(chunk)
+        cached = cache.get_many(chunk)
+        if cached:
+            results.update(cached)
+            if on_batch:
+                on_batch(len(cached))
+        batch.extend(vid for vid in chunk if vid not in cached)
+        if len(batch) >= 50:
+            yield batch[:50]
+            batch = batch[50:]
+    if batch:
+        yield batch
+
+
+def iter_video_details(youtube, video_ids: Iterable[str],
+                       on_batch: Optional[Callable[[int], None]] = None
+                       ) -> Iterator[Tuple[str, Tuple[bool, int]]]:
+    """
+    Get video details including existence and duration for multiple videos.
+    Yields (video_id, (exists, duration_seconds)) pairs as each batch completes,
+    so the caller can start using them while later batches are fetched.
+    Duplicate IDs are only looked up, and yielded, once.
+    Uses a single API call for up to 50 videos, with up to
+    MAX_CONCURRENT_REQUESTS calls in flight at once.
+    video_ids can be any iterable, such as a generator fed while the links are
+    still being read: each batch is sent as soon as it is complete, with at
+    most MAX_PENDING_BATCHES batches waiting for a response.
+    Results are cached on disk for VIDEO_CACHE_TTL seconds, or
+    MISSING_VIDEO_CACHE_TTL seconds for unavailable videos, and are only
+    looked up again once they expire.
+    If on_batch is given, it is called with the number of videos after each
+    batch is fetched, or found in the cache.
+    """
+    executor = _get_executor()
+    cached = {}  # Filled by _uncached_batches as it reads the IDs
+    batches = _uncached_batches(video_ids, cached, on_batch)
+    pending = {}  # future -> batch
+    exhausted = False
+    try:
+        while not exhausted or pending:
+            # Send new batches of uncached videos while there is room
+            while not exhausted and len(pending) < MAX_PENDING_BATCHES:
+                batch = next(batches, None)
+                if batch is None:
+                    exhausted = True
+                    break
+                pending[executor.submit(_get_video_details_batch, youtube, batch)] = batch
+            
+            yield from cached.items()
+            cached.clear()
+            
+            if not pending:
+                break  # Every video was in the cache
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                batch = pending.pop(future)
+                # Re-raises QuotaExceededException from the worker
+                yield from future.result().items()
+                if on_batch:
+                    on_batch(len(batch))
+    finally:
+        # Don't start batches that are still queued if one of them failed,
+        # or if the caller stopped iterating
+        for future in pending:
+            future.cancel()
+
+
+def get_video_details(youtube, video_ids: Iterable[str],
+                      on_batch: Optional[Callable[[int], None]] = None) -> Dict[str, Tuple[bool, int]]:
+    """
+    Get video details including existence and duration for multiple videos.
+    Returns a dictionary mapping video_id to tuple (exists, duration_seconds).
+    See iter_video_details, which this collects the results of.
+    """
+    return dict(iter_video_details(youtube, video_ids, on_batch))
+
+
 def parse_duration(duration: str) -> int:
     """
     Parse ISO 8601 duration format to seconds.
-    Example: PT1H2M10S -> 3730 seconds
+    Example: PT1H2M10S -> 3730 seconds, P1DT2H -> 93600 seconds
     """
-    match = re.match(r'PT(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?', duration)
+    # Scan the string by hand, which is much faster than the regex for the
+    # durations the API returns. Videos longer than a day have a day part.
+    if duration.startswith('P'):
+        total = 0
+        number = None
+        units = None  # Not past the 'T' yet, only days are allowed
+        for char in duration[1:]:
+            if '0' <= char <= '9':
+                number = (number or 0) * 10 + ord(char) - 48
+            elif number is None:
+                if char != 'T' or units is not None:
+                    break
+                units = _DURATION_TIME_UNITS
+            elif units is None and char == 'D':
+                total += number * 86400
+                number = None
+            elif units is not None and char in units:
+                total += number * units[char]
+                number = None
+            else:
+                break
+        else:
+            if number is None:
+                return total
+    
+    # Fall back to the regex for anything unusual
+    match = _DURATION_RE.fullmatch(duration)
     if not match:
         return 0
     
-    hours, minutes, seconds = match.groups()
-    total = 0
-    if hours:
-        total += int(hours) * 3600
-    if minutes:
-        total += int(minutes) * 60
-    if seconds:
-        total += int(seconds)
-    
-    return total
+    hours, minutes, seconds = (int(group) if group else 0 for group in match.groups())
+    return hours * 3600 + minutes * 60 + seconds
 
 
 def get_playlist_size(youtube, playlist_id: str) -> int:
     """
     Get the current number of videos in a playlist.
+    The result is cached for the lifetime of the process, and kept up to date
+    as videos are added; see invalidate_playlist_size to fetch it again.
+    Raises QuotaExceededException if the quota is exceeded.
     """
+    if playlist_id in _playlist_size_cache:
+        return _playlist_size_cache[playlist_id]
     try:
         request = youtube.playlistItems().list(
             part="id",
             maxResults=1,
-            playlistId=playlist_id
+            playlistId=playlist_id,
+            # Only the total is needed, not the item itself
+            fields="pageInfo/totalResults"
         )
-        response = request.execute()
-        return int(response['pageInfo']['totalResults'])
+        response = _execute(request)
+        size = int(response['pageInfo']['totalResults'])
+        _playlist_size_cache[playlist_id] = size
+        return size
     except HttpError as e:
-        if "quota" in str(e).lower():
+        if _is_quota_exceeded(e):
             raise QuotaExceededException(str(e))
-        return 0
+        raise
+
+
+def invalidate_playlist_size(playlist_id: str) -> None:
+    """
+    Forget the cached size of a playlist, e.g. after it was changed outside
+    of this script, so the next get_playlist_size call fetches it again.
+    """
+    with _playlist_size_lock:
+        _playlist_size_cache.pop(playlist_id, None)
+
+
+def _count_added_video(playlist_id: str) -> None:
+    """
+    Update the cached size of a playlist after a video was added to it.
+    """
+    with _playlist_size_lock:
+        if playlist_id in _playlist_size_cache:
+            _playlist_size_cache[playlist_id] += 1
 
 
 def get_playlist_video_ids(youtube, playlist_id: str) -> set:
     """
     Get all video IDs that are currently in a playlist.
     Returns a set of video IDs.
-    Raises QuotaExceededException if the quota is exceeded.
+    Raises QuotaExceededException if the quota is exceeded, or the HttpError
+    for any other API error.
+    Safe to call from a worker thread.
     """
     video_ids = set()
     next_page_token = None
@@ -181,9 +616,11 @@ def get_playlist_video_ids(youtube, playlist_id: str) -> set:
                 part="contentDetails",
                 playlistId=playlist_id,
                 maxResults=50,  # Maximum allowed by the API
-                pageToken=next_page_token
+                pageToken=next_page_token,
+                # Only return what we use
+                fields="items/contentDetails/videoId,nextPageToken"
             )
-            response = request.execute()
+            response = _execute(request, http=_thread_http(request.http.credentials))
             
             # Extract video IDs from the response
             for item in response.get('items', []):
@@ -198,53 +635,119 @@ def get_playlist_video_ids(youtube, playlist_id: str) -> set:
         return video_ids
         
     except HttpError as e:
-        error_str = str(e)
-        if "quota" in error_str.lower():
-            raise QuotaExceededException(error_str)
-        # For other errors, return an empty set
-        print(f"Error fetching playlist videos: {error_str}")
-        return set()
-    except Exception as e:
-        print(f"Error fetching playlist videos: {str(e)}")
-        return set()
+        if _is_quota_exceeded(e):
+            raise QuotaExceededException(str(e))
+        raise
 
 
-def create_playlist_item(youtube, playlist_id: str, video_id: str):
+def _playlist_item_body(playlist_id: str, video_id: str) -> dict:
     """
-    Add a video to a playlist.
-    Returns the response if successful, None if failed.
-    Raises QuotaExceededException if the quota is exceeded.
+    Build the request body to add a video to a playlist.
     """
-    try:
-        return youtube.playlistItems().insert(
-            part="snippet",
-            body={
-                "snippet": {
-                    "playlistId": playlist_id,
-                    "resourceId": {
-                        "kind": "youtube#video",
-                        "videoId": video_id
-                    }
-                }
+    return {
+        "snippet": {
+            "playlistId": playlist_id,
+            "resourceId": {
+                "kind": "youtube#video",
+                "videoId": video_id
             }
-        ).execute()
-    except HttpError as e:
-        error_str = str(e)
-        if "quota" in error_str.lower():
-            print(f"Error adding video {video_id}: {error_str}")
-            raise QuotaExceededException(error_str)
-        print(f"Error adding video {video_id}: {error_str}")
-        return None
-    except Exception as e:
-        print(f"Error adding video {video_id}: {str(e)}")
-        return None
+        }
+    }
+
+
+def create_playlist_items_batch(youtube, playlist_id: str, video_ids: List[str],
+                                callback: Callable[[str, Optional[dict], Optional[Exception]], None]) -> None:
+    """
+    Add several videos to a playlist using batch requests.
+    Videos are sent in batches of up to MAX_BATCH_SIZE inserts, with up to
+    MAX_CONCURRENT_BATCHES batches executed at the same time, paced by the
+    rate limiter and at most one insert every INSERT_MIN_INTERVAL seconds.
+    callback(video_id, response, exception) is called once per video from a
+    worker thread, with the video ID as the batch request ID; exception is a
+    QuotaExceededException if the quota is exceeded.
+    Inserts that are rate limited or hit a server error are sent again in a
+    smaller batch after the delay asked by the server, or an exponential
+    backoff, up to MAX_RETRIES times. Timeouts and connection failures of a
+    whole batch are reported for every video in it and not retried, since
+    the inserts may already have been applied.
+    Once the quota is exceeded, batches that haven't started are not sent and
+    their videos get no callback, so the caller can retry them later.
+    """
+    quota_exceeded = threading.Event()
+
+    def report(video_id, response, exception):
+        if isinstance(exception, HttpError) and _is_quota_exceeded(exception):
+            quota_exceeded.set()
+            exception = QuotaExceededException(str(exception))
+        elif exception is None:
+            _count_added_video(playlist_id)
+        callback(video_id, response, exception)
+
+    def execute(batch_ids):
+        for attempt in range(MAX_RETRIES + 1):
+            if quota_exceeded.is_set():
+                return
+            can_retry = attempt < MAX_RETRIES
+            to_retry = {}  # Video ID -> error, for the inserts to send again
+            answered = set()
+
+            def on_response(request_id, response, exception):
+                answered.add(request_id)
+                if can_retry and isinstance(exception, HttpError) and _is_transient(exception):
+                    to_retry[request_id] = exception
+                else:
+                    report(request_id, response, exception)
+
+            batch = youtube.new_batch_http_request(callback=on_response)
+            for vid in batch_ids:
+                request = youtube.playlistItems().insert(
+                    part="snippet",
+                    body=_playlist_item_body(playlist_id, vid)
+                )
+                batch.add(request, request_id=vid)
+            # Worker threads are shared, so limit the batches in flight here
+            with _batch_slots:
+                # Another batch may have hit the quota while this one was waiting
+                if quota_exceeded.is_set():
+                    return
+                _rate_limiter.acquire(INSERT_COST * len(batch_ids))
+                # Wait as long as the inserts would have been spaced out if sent one by one
+                _insert_pacer.acquire(len(batch_ids))
+                try:
+                    batch.execute(http=_thread_http(request.http.credentials))
+                except HttpError as e:
+                    # The whole batch request failed, report it for every video in it
+                    for vid in batch_ids:
+                        on_response(vid, None, e)
+                except TRANSPORT_ERRORS as e:
+                    # The inserts may have been applied before the connection failed,
+                    # so don't send them again
+                    for vid in batch_ids:
+                        if vid not in answered:
+                            report(vid, None, e)
+            
+            if not to_retry:
+                return
+            # Only send the failed inserts again, the others are done
+            batch_ids = [vid for vid in batch_ids if vid in to_retry]
+            time.sleep(max(_retry_delay(e, attempt) for e in to_retry.values()))
+
+    batches = [video_ids[i:i + MAX_BATCH_SIZE] for i in range(0, len(video_ids), MAX_BATCH_SIZE)]
+    if not batches:
+        return
+    
+    executor = _get_executor()
+    futures = [executor.submit(execute, batch_ids) for batch_ids in batches]
+    for future in futures:
+        future.result()
 
 
 def video_exists_in_playlist(youtube, playlist_id: str, video_id: str) -> bool:
     """
     Check if a video already exists in a playlist.
     Returns True if the video is already in the playlist, False otherwise.
-    Raises QuotaExceededException if the quota is exceeded.
+    Raises QuotaExceededException if the quota is exceeded, and HttpError
+    for other API errors.
     """
     try:
         # Search for the video in the playlist
@@ -254,18 +757,11 @@ def video_exists_in_playlist(youtube, playlist_id: str, video_id: str) -> bool:
             videoId=video_id,
             maxResults=1
         )
-        response = request.execute()
+        response = _execute(request)
         
         # If there are items, the video exists in the playlist
         return len(response.get('items', [])) > 0
     except HttpError as e:
-        error_str = str(e)
-        if "quota" in error_str.lower():
-            print(f"Error checking if video {video_id} exists: {error_str}")
-            raise QuotaExceededException(error_str)
-        # For other errors, assume the video doesn't exist
-        print(f"Error checking if video {video_id} exists: {error_str}")
-        return False
-    except Exception as e:
-        print(f"Error checking if video {video_id} exists: {str(e)}")
-        return False
+        if _is_quota_exceeded(e):
+            raise QuotaExceededException(str(e))
+        raise